@@ -1,5 +1,5 @@
 import pytest
-from backend import FAQItem, FAQSearchEngine
+from backend import BM25SearchEngine, FAQItem, FAQSearchEngine
 
 @pytest.fixture
 def sample_faqs():
@@ -28,8 +28,36 @@ def test_search_no_match(sample_faqs):
     assert result is None
     assert score < engine.threshold
 
+def test_search_batch(sample_faqs):
+    engine = FAQSearchEngine(sample_faqs)
+    results = engine.search_batch(["return policy", "track my order", "random gibberish xyz"])
+    assert results[0][0].id == 1
+    assert results[1][0].id == 2
+    assert results[2][0] is None
+
 def test_empty_query(sample_faqs):
     engine = FAQSearchEngine(sample_faqs)
     result, score = engine.search("")
     assert result is None
     assert score == 0.0
+
+@pytest.fixture
+def bm25_faqs(sample_faqs):
+    # Okapi idf degenerates to zero when a term appears in half the corpus,
+    # so BM25 needs at least three documents to produce positive scores.
+    return sample_faqs + [
+        FAQItem(id=3, question="Do you offer free shipping?", answer="Yes, over 999.", category="shipping"),
+    ]
+
+def test_bm25_relevant_match(bm25_faqs):
+    engine = BM25SearchEngine(bm25_faqs)
+    result, score = engine.search("return policy")
+    assert result is not None
+    assert result.id == 1
+    assert score > engine.threshold
+
+def test_bm25_no_match(bm25_faqs):
+    engine = BM25SearchEngine(bm25_faqs)
+    result, score = engine.search("random gibberish xyz")
+    assert result is None
+    assert score < engine.threshold